@@ -1,110 +1,605 @@
 import openai
+import httpx
 from fastapi import FastAPI, UploadFile, File, Form
-import fitz  # PyMuPDF for PDFs
-from docx import Document
+from fastapi.responses import ORJSONResponse
 import os
-import json
+import importlib.util
+import io
+import tempfile
+import asyncio
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import orjson
 from dotenv import load_dotenv
 import re
+import hashlib
+import tiktoken
+from collections import OrderedDict
+from typing import List
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
-
 # OpenAI API Key
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your_openai_api_key_here")
 
-# OpenAI client instance
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]"); fall back to HTTP/1.1 without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Shared OpenAI client instance; one pooled connection set for every request.
+# DefaultAsyncHttpxClient keeps the SDK's own transport defaults (redirects etc.).
+client = openai.AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=openai.DefaultAsyncHttpxClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+        timeout=httpx.Timeout(60.0, connect=5.0)
+    )
+)
+
+# Model used for file-structure generation
+GPT_MODEL = "gpt-4o"
+
+# Static instructions, sent first and identical across requests; only the PRD (user message) varies.
+# At ~110 tokens this is below the 1024-token minimum for OpenAI's automatic prompt caching, and is
+# deliberately not padded to reach it: padding changes the output and costs more than the cache saves.
+_PROMPT_TEMPLATE = """You are a highly experienced software architect specializing in full-stack development.
+Generate a **detailed project directory structure** in **JSON format** for the PRD supplied by the user.
+
+**Instructions:**
+- Use a JSON **nested dictionary format**.
+- **Keys represent directories or files**.
+- **Values describe purpose or contain subdirectories**.
+- Ensure **best practices** for the chosen tech stack ({stack_name}).
+
+Generate the **final directory structure in JSON format**, ensuring all PRD features are included.
+Respond only with JSON.
+"""
+
+STATIC_PROMPTS = {
+    "django-react": _PROMPT_TEMPLATE.format(stack_name="DJANGO-REACT"),
+    "nodejs-react": _PROMPT_TEMPLATE.format(stack_name="NODEJS-REACT"),
+}
+
+# Prebuilt system messages; only the user message is assembled per request
+_SYSTEM_MESSAGES = {stack: {"role": "system", "content": prompt} for stack, prompt in STATIC_PROMPTS.items()}
+_USER_MESSAGE_TEMPLATE = "PRD:\n{prd_text}"
+
+# Supported tech stacks; helpers below expect the lower-cased name
+_VALID_STACKS = frozenset(STATIC_PROMPTS)
+
+# Response formats: the parsed JSON structure, or the same structure rendered as a text tree
+_OUTPUT_FORMATS = frozenset({"json", "tree"})
+
+# Maximum number of PRDs (files + texts) accepted by the batch endpoint
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "20"))
+
+# PRD text is condensed to this many tokens before prompting
+PRD_MAX_TOKENS = int(os.getenv("PRD_MAX_TOKENS", "4000"))
+
+# Headings, labelled lines, numbered items and bullets carry the feature list
+_STRUCTURAL_LINE_RE = re.compile(r"^\s*(#+\s|[A-Z][A-Za-z ]+:|\d+\.\s|•\s|-\s|\*\s)")
+
+# Tokenizer for the budget; loaded in the lifespan hook so a missing/undownloadable
+# encoding fails at deploy time rather than inside a request
+_encoding = None
+
+# Function to shrink a PRD to the token budget, keeping structural lines first
+def _condense(prd_text, max_tokens=PRD_MAX_TOKENS):
+    # Every token covers at least one UTF-8 byte, so short text can skip tokenizing
+    if len(prd_text.encode()) <= max_tokens:
+        return prd_text
+    # PRD text is data: special-token markers like <|endoftext|> are encoded as plain text
+    if len(_encoding.encode(prd_text, disallowed_special=())) <= max_tokens:
+        return prd_text
+
+    lines = [line for line in prd_text.splitlines() if line.strip()]
+    line_tokens = _encoding.encode_batch(lines, disallowed_special=())
+    structural = [i for i, line in enumerate(lines) if _STRUCTURAL_LINE_RE.match(line)]
+    structural_set = set(structural)
+    prose = [i for i in range(len(lines)) if i not in structural_set]
+
+    kept = {}
+    budget = max_tokens
+    for i in structural + prose:
+        cost = len(line_tokens[i]) + 1  # +1 for the newline
+        if cost <= budget:
+            kept[i] = lines[i]
+            budget -= cost
+        elif budget > 1:
+            # A line longer than what's left is cut to fit rather than dropped
+            kept[i] = _encoding.decode(line_tokens[i][:budget - 1])
+            break
+        else:
+            break
+    return "\n".join(kept[i] for i in sorted(kept))
+
+# Output budget: grows with the original (pre-condense) PRD length; a truncated
+# response is retried once at MAX_OUTPUT_TOKENS
+MIN_OUTPUT_TOKENS = 1536
+MAX_OUTPUT_TOKENS = 4096
+
+def _estimate_max_tokens(prd_text):
+    return min(MAX_OUTPUT_TOKENS, MIN_OUTPUT_TOKENS + len(prd_text) // 20)
+
+# Uploads are read into memory in chunks of this size
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# PDFs with at least this many pages are split across a pool of worker processes
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+# Set PDF_EXTRACT_WORKERS=0 to disable the pool (e.g. on all but one server worker)
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(8, os.cpu_count() or 1))))
+_pdf_pool = None  # created in the lifespan hook of the serving process; None means extract sequentially
+PDF_POOL_LOCK_PATH = os.getenv("PDF_POOL_LOCK_PATH", os.path.join(tempfile.gettempdir(), "prd-pdf-pool.lock"))
+_pdf_pool_lock = None
+
+# Function to claim the PDF pool for this server worker; with several uvicorn workers only the
+# first gets it (the OS drops the lock when the process exits, so it can't go stale)
+def _claim_pdf_pool():
+    global _pdf_pool_lock
+    lock_file = open(PDF_POOL_LOCK_PATH, "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _pdf_pool_lock = lock_file
+    return True
+
+# Exact-match cache of parsed GPT responses, keyed by (model, tech_stack, prd_text) hash
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+_response_cache = OrderedDict()
+
+def _cache_key(tech_stack, prd_text):
+    return hashlib.sha256(f"{GPT_MODEL}|{tech_stack}|{prd_text}".encode()).hexdigest()
+
+def _cache_get(key):
+    if key not in _response_cache:
+        return None
+    _response_cache.move_to_end(key)
+    return _response_cache[key]
+
+def _cache_set(key, value):
+    _response_cache[key] = value
+    _response_cache.move_to_end(key)
+    while len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+
+# Semantic cache: nearest-neighbour lookup over PRD embeddings (enable with SEMANTIC_CACHE=1)
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "semantic_cache.faiss")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))  # per tech stack
+SEMANTIC_CACHE_SAVE_EVERY = int(os.getenv("SEMANTIC_CACHE_SAVE_EVERY", "25"))
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536
+
+# One index per tech stack, so a near-duplicate cached for another stack can't shadow a hit
+_semantic_indexes = {}
+_semantic_entries = {}  # per stack, parallel to index rows: file_structure
+_semantic_unsaved = 0
+_semantic_save_lock = asyncio.Lock()
+
+def _semantic_cache_paths(tech_stack):
+    index_path = f"{SEMANTIC_CACHE_PATH}.{tech_stack}"
+    return index_path, index_path + ".json"
+
+# Function to load the per-stack indexes; called from the lifespan hook so PDF pool workers,
+# which re-import this module, don't each load faiss and read the whole cache
+def _load_semantic_cache():
+    global faiss, np
+    import faiss
+    import numpy as np
+
+    for stack in _VALID_STACKS:
+        index_path, entries_path = _semantic_cache_paths(stack)
+        index, entries = None, []
+        if os.path.exists(index_path) and os.path.exists(entries_path):
+            index = faiss.read_index(index_path)
+            with open(entries_path, "rb") as f:
+                entries = orjson.loads(f.read())
+            # A crash between the two file swaps leaves them out of step; start empty rather than misserve
+            if index.ntotal != len(entries):
+                index, entries = None, []
+        _semantic_indexes[stack] = index if index is not None else faiss.IndexFlatIP(EMBEDDING_DIM)
+        _semantic_entries[stack] = entries
+
+async def _embed(prd_text):
+    response = await client.embeddings.create(model=EMBEDDING_MODEL, input=prd_text)
+    embedding = response.data[0].embedding
+    vector = np.array([embedding], dtype="float32")
+    faiss.normalize_L2(vector)
+    return vector
+
+def _semantic_cache_get(vector, tech_stack):
+    index = _semantic_indexes[tech_stack]
+    if index.ntotal == 0:
+        return None
+    scores, ids = index.search(vector, 1)
+    if scores[0][0] < SEMANTIC_CACHE_THRESHOLD:
+        return None
+    return _semantic_entries[tech_stack][ids[0][0]]
+
+# Function to write cache files via temp files + os.replace, so none is ever half-written
+def _write_semantic_cache(snapshots):
+    for stack, index_bytes, entries in snapshots:
+        index_path, entries_path = _semantic_cache_paths(stack)
+        for path, payload in ((index_path, index_bytes), (entries_path, orjson.dumps(entries))):
+            with open(path + ".tmp", "wb") as f:
+                f.write(payload)
+            os.replace(path + ".tmp", path)
+
+async def _save_semantic_cache():
+    global _semantic_unsaved
+    async with _semantic_save_lock:
+        if _semantic_unsaved == 0:
+            return
+        # Only the raw index copy and a shallow copy of the entry list happen on the event loop;
+        # JSON encoding and file I/O run in a thread (cached structures are never mutated)
+        snapshots = [
+            (stack, faiss.serialize_index(index).tobytes(), list(_semantic_entries[stack]))
+            for stack, index in _semantic_indexes.items()
+        ]
+        _semantic_unsaved = 0
+        await asyncio.to_thread(_write_semantic_cache, snapshots)
+
+# Strong references to background saves so they aren't garbage-collected mid-run
+_background_tasks = set()
+
+async def _semantic_cache_set(vector, tech_stack, file_structure):
+    global _semantic_unsaved
+    index = _semantic_indexes[tech_stack]
+    if index.ntotal >= SEMANTIC_CACHE_MAX_ENTRIES:
+        return
+    index.add(vector)
+    _semantic_entries[tech_stack].append(file_structure)
+    _semantic_unsaved += 1
+    # Persist in batches (and at shutdown), in the background so no request waits on it
+    if _semantic_unsaved >= SEMANTIC_CACHE_SAVE_EVERY and not _semantic_save_lock.locked():
+        task = asyncio.create_task(_save_semantic_cache())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+# Tracks brace depth over streamed text so we can stop once the outer JSON object closes
+class _JSONObjectScanner:
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text):
+        """Consumes a chunk of text; returns True once the outermost object is complete."""
+        for char in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = self.started
+            elif char == "{":
+                self.depth += 1
+                self.started = True
+            elif char == "}" and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
 
-# Function to extract text from a DOCX file
-def extract_text_from_docx(docx_path):
-    doc = Document(docx_path)
-    return "\n".join([para.text for para in doc.paragraphs])
+# Function to stream GPT output until the JSON object closes; returns (text, truncated)
+async def _call_gpt(tech_stack, prd_text, max_tokens):
+    scanner = _JSONObjectScanner()
+    parts = []
+    finish_reason = None
+    async with await client.chat.completions.create(
+        model=GPT_MODEL,
+        messages=[
+            _SYSTEM_MESSAGES[tech_stack],
+            {"role": "user", "content": _USER_MESSAGE_TEMPLATE.format(prd_text=prd_text)}
+        ],
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"},
+        stream=True
+    ) as stream:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            parts.append(delta)
+            # Closing the stream early stops generation of any trailing prose
+            if scanner.feed(delta):
+                break
+    return "".join(parts).strip(), finish_reason == "length"
 
-# Function to extract text from a PDF file
-def extract_text_from_pdf(pdf_path):
-    doc = fitz.open(pdf_path)
-    return "\n".join([page.get_text("text") for page in doc])
+# Function to extract text from DOCX bytes
+def extract_text_from_docx_bytes(data):
+    from docx import Document  # imported lazily; only DOCX uploads pay for python-docx
+    doc = Document(io.BytesIO(data))
+    return "\n".join(para.text for para in doc.paragraphs)
+
+# Function to open PDF bytes
+def _open_pdf(data):
+    import fitz  # PyMuPDF, imported lazily; only PDF uploads pay for the C extension
+    return fitz.open(stream=data, filetype="pdf")
+
+# Function to extract text from a page range; each worker opens its own document
+def _extract_pdf_pages(data, start, stop):
+    with _open_pdf(data) as doc:
+        return "\n".join(doc.load_page(i).get_text("text") for i in range(start, stop))
+
+# Function to extract text from PDF bytes; returns None for large PDFs that should be split
+def _extract_small_pdf(data):
+    with _open_pdf(data) as doc:
+        page_count = doc.page_count
+        if page_count < PDF_PARALLEL_MIN_PAGES or _pdf_pool is None:
+            return "\n".join(page.get_text("text") for page in doc), page_count
+    return None, page_count
+
+# Function to extract PDF text; large PDFs are split across the worker processes without
+# holding a thread (the default executor is shared with every other request)
+async def extract_text_from_pdf_bytes(data):
+    text, page_count = await asyncio.to_thread(_extract_small_pdf, data)
+    if text is not None:
+        return text
+
+    loop = asyncio.get_running_loop()
+    step = -(-page_count // PDF_EXTRACT_WORKERS)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(_pdf_pool, _extract_pdf_pages, data, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ))
+    return "\n".join(parts)
+
+async def extract_text_from_docx(data):
+    return await asyncio.to_thread(extract_text_from_docx_bytes, data)
+
+# Supported upload types: extension -> (leading magic bytes, async extractor)
+_EXTRACTORS = {
+    ".pdf": (b"%PDF", extract_text_from_pdf_bytes),
+    ".docx": (b"PK", extract_text_from_docx),  # DOCX is a ZIP container
+}
+
+# Startup: load the tokenizer and semantic cache, bound the default executor used by asyncio.to_thread and
+# start the PDF worker pool.
+# Shutdown: close the OpenAI client, flush the semantic cache and stop the pool.
+@asynccontextmanager
+async def lifespan(app):
+    global _pdf_pool, _encoding
+    _encoding = tiktoken.encoding_for_model(GPT_MODEL)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=os.cpu_count()))
+    if SEMANTIC_CACHE_ENABLED:
+        _load_semantic_cache()
+    # Created once, before any request threads exist; forkserver (spawn where it isn't
+    # available, e.g. Windows) avoids forking a multi-threaded process that may be inside MuPDF
+    if PDF_EXTRACT_WORKERS > 1 and _claim_pdf_pool():
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pdf_pool = ProcessPoolExecutor(
+            max_workers=PDF_EXTRACT_WORKERS,
+            mp_context=multiprocessing.get_context(start_method)
+        )
+
+    yield
+
+    await client.close()
+    if SEMANTIC_CACHE_ENABLED:
+        # Let any running background save finish, then flush what's left
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+        await _save_semantic_cache()
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
+
+# Function to list a directory's entries; GPT often uses arrays for file lists, where strings
+# are files and objects are subtrees
+def _tree_children(value):
+    if isinstance(value, dict):
+        return list(value.items())
+    children = []
+    for item in value:
+        if isinstance(item, dict):
+            children.extend(item.items())
+        else:
+            children.append((item, None))
+    return children
+
+# Function to render a nested structure as an indented directory tree
+def _render_tree(structure, prefix=""):
+    lines = []
+    items = _tree_children(structure)
+    for index, (name, value) in enumerate(items):
+        last = index == len(items) - 1
+        connector = "└── " if last else "├── "
+        if isinstance(value, (dict, list)):
+            lines.append(f"{prefix}{connector}{name}/")
+            lines.extend(_render_tree(value, prefix + ("    " if last else "│   ")))
+        elif isinstance(value, str):
+            lines.append(f"{prefix}{connector}{name}  # {value}")
+        else:
+            lines.append(f"{prefix}{connector}{name}")
+    return lines
+
+def _format_structure(file_structure, output_format):
+    if output_format == "tree":
+        return {"file_structure": "\n".join(_render_tree(file_structure))}
+    return {"file_structure": file_structure}
+
+# Function to read an upload and extract its text; returns (prd_text, error)
+async def _extract_upload(file):
+    extractor = _EXTRACTORS.get(os.path.splitext(file.filename or "")[1].lower())
+    if extractor is None:
+        return None, {"error": "Unsupported file format. Use DOCX or PDF."}
+    magic, extract = extractor
+
+    data = bytearray()
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        data += chunk
+    data = bytes(data)
+
+    # Don't trust the client-supplied name alone
+    if not data.startswith(magic):
+        return None, {"error": "File content does not match its extension. Use DOCX or PDF."}
+    return await extract(data), None
+
+# In-flight cache fills keyed by cache key, so concurrent identical PRDs share one GPT call
+_inflight = {}
+
+# Function to resolve a cache miss (semantic lookup, then GPT); returns (file_structure, error)
+async def _fill_cache(cache_key, prd_text, tech_stack, max_tokens):
+    # Fall back to a semantic lookup for near-duplicate PRDs
+    prd_vector = None
+    if SEMANTIC_CACHE_ENABLED:
+        try:
+            prd_vector = await _embed(prd_text)
+        except Exception:
+            # The cache is an optimization; an embedding outage shouldn't fail the request
+            prd_vector = None
+        if prd_vector is not None:
+            cached = _semantic_cache_get(prd_vector, tech_stack)
+            if cached is not None:
+                _cache_set(cache_key, cached)
+                return cached, None
+
+    # Call OpenAI GPT-4o with the static instructions + PRD
+    gpt_response, truncated = await _call_gpt(tech_stack, prd_text, max_tokens=max_tokens)
+    if truncated and max_tokens < MAX_OUTPUT_TOKENS:
+        max_tokens = MAX_OUTPUT_TOKENS
+        gpt_response, truncated = await _call_gpt(tech_stack, prd_text, max_tokens=max_tokens)
+    if truncated:
+        return None, {
+            "error": f"GPT response was cut off at the {max_tokens}-token output limit",
+            "raw_response": gpt_response
+        }
+
+    # Check if API Response is Empty
+    if not gpt_response:
+        return None, {"error": "OpenAI API did not return a response"}
+
+    # Parse JSON Safely (JSON mode guarantees a bare object)
+    try:
+        file_structure_json = orjson.loads(gpt_response)
+    except orjson.JSONDecodeError as e:
+        return None, {
+            "error": f"GPT response is not valid JSON: {str(e)}",
+            "raw_response": gpt_response
+        }
+
+    _cache_set(cache_key, file_structure_json)
+    if prd_vector is not None:
+        await _semantic_cache_set(prd_vector, tech_stack, file_structure_json)
+    return file_structure_json, None
+
+# Function to generate the file structure for already-extracted PRD text
+async def _generate(prd_text, tech_stack, output_format):
+    # Size the output from the full PRD, then bound prompt size (and cost) for very long PRDs
+    max_tokens = _estimate_max_tokens(prd_text)
+    prd_text = await asyncio.to_thread(_condense, prd_text)
+    if not prd_text.strip():
+        return {"error": "No PRD text provided."}
+
+    # Serve identical (tech_stack, PRD) submissions from the cache
+    cache_key = _cache_key(tech_stack, prd_text)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return _format_structure(cached, output_format)
+
+    # Join an identical request that is already being generated, or start one
+    task = _inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_fill_cache(cache_key, prd_text, tech_stack, max_tokens))
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _: _inflight.pop(cache_key, None))
+    # Shielded so one disconnecting client doesn't cancel the fill for the others
+    file_structure, error = await asyncio.shield(task)
+    if error:
+        return error
+    return _format_structure(file_structure, output_format)
+
+# Function to normalize and check the shared form options; returns (tech_stack, error)
+def _validate_options(tech_stack, output_format):
+    tech_stack = tech_stack.lower()
+    if tech_stack not in _VALID_STACKS:
+        return None, {"error": "Invalid tech stack. Choose 'django-react' or 'nodejs-react'."}
+    if output_format not in _OUTPUT_FORMATS:
+        return None, {"error": "Invalid output format. Choose 'json' or 'tree'."}
+    return tech_stack, None
 
 @app.post("/generate-file-structure/")
 async def generate_file_structure(
     file: UploadFile = File(None), 
     prd_text: str = Form(None),  
-    tech_stack: str = Form(...)
+    tech_stack: str = Form(...),
+    output_format: str = Form("json")
 ):
-    """Reads PRD document and generates a detailed, optimized file structure in JSON format for Django+React or Node.js+React."""
+    """Reads PRD document and generates a detailed, optimized file structure (JSON or directory tree) for Django+React or Node.js+React."""
     try:
+        # Normalize the tech stack once and fail fast before any parsing
+        tech_stack, error = _validate_options(tech_stack, output_format)
+        if error:
+            return error
+
         # Step 1: Extract PRD text from document or take direct input
         if file:
-            file_path = f"temp_{file.filename}"
-            with open(file_path, "wb") as buffer:
-                buffer.write(await file.read())
-
-            if file.filename.endswith(".docx"):
-                prd_text = extract_text_from_docx(file_path)
-            elif file.filename.endswith(".pdf"):
-                prd_text = extract_text_from_pdf(file_path)
-            else:
-                return {"error": "Unsupported file format. Use DOCX or PDF."}
+            prd_text, error = await _extract_upload(file)
+            if error:
+                return error
 
         if not prd_text:
             return {"error": "No PRD text provided."}
 
-        if tech_stack.lower() not in ["django-react", "nodejs-react"]:
-            return {"error": "Invalid tech stack. Choose 'django-react' or 'nodejs-react'."}
-
-        # Step 2: Optimized Prompt for GPT-4o
-        prompt = f"""
-        You are an expert software architect. Generate a **detailed project directory structure** in **JSON format**.
-
-        **Instructions:**
-        - Use a JSON **nested dictionary format**.
-        - **Keys represent directories or files**.
-        - **Values describe purpose or contain subdirectories**.
-        - Ensure **best practices** for the chosen tech stack ({tech_stack.upper()}).
-
-        **PRD Document for Context:**
-        ```
-        {prd_text}
-        ```
-
-        Generate the **final directory structure in JSON format**, ensuring all PRD features are included.
-        """
-
-        # Step 3: Call OpenAI GPT-4o
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a highly experienced software architect specializing in full-stack development."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=4096
-        )
+        # Step 2: Generate (cached or via GPT-4o) in the requested format
+        return await _generate(prd_text, tech_stack, output_format)
 
-        # Step 4: Check if API Response is Empty
-        gpt_response = response.choices[0].message.content.strip()
-        if not gpt_response:
-            return {"error": "OpenAI API did not return a response"}
+    except Exception as e:
+        return {"error": str(e)}
 
-        # Step 5: Extract Only the JSON Block
-        match = re.search(r"\{.*\}", gpt_response, re.DOTALL)
-        if not match:
-            return {"error": "No valid JSON found in GPT response", "raw_response": gpt_response}
+@app.post("/generate-file-structure-batch/")
+async def generate_file_structure_batch(
+    files: List[UploadFile] = File(None),
+    prd_texts: List[str] = Form(None),
+    tech_stack: str = Form(...),
+    output_format: str = Form("json")
+):
+    """Generates file structures for several PRDs (documents and/or raw text) concurrently; results keep input order, files first."""
+    tech_stack, error = _validate_options(tech_stack, output_format)
+    if error:
+        return error
 
-        gpt_response_cleaned = match.group(0)
+    files = files or []
+    prd_texts = prd_texts or []
+    if not files and not prd_texts:
+        return {"error": "No PRD text provided."}
+    if len(files) + len(prd_texts) > MAX_BATCH_SIZE:
+        return {"error": f"Too many PRDs in one batch. Send at most {MAX_BATCH_SIZE}."}
 
-        # Step 6: Parse JSON Safely
+    async def _one(file=None, prd_text=None):
+        # Errors are reported per PRD so one bad input doesn't fail the batch
         try:
-            file_structure_json = json.loads(gpt_response_cleaned)
-        except json.JSONDecodeError as e:
-            return {
-                "error": f"GPT response is not valid JSON: {str(e)}",
-                "raw_response": gpt_response
-            }
-
-        return {"file_structure": file_structure_json}
+            if file:
+                prd_text, error = await _extract_upload(file)
+                if error:
+                    return error
+            if not prd_text:
+                return {"error": "No PRD text provided."}
+            return await _generate(prd_text, tech_stack, output_format)
+        except Exception as e:
+            return {"error": str(e)}
 
-    except Exception as e:
-        return {"error": str(e)}
+    # Cache hits return immediately; distinct misses run concurrently, identical ones share a call
+    results = await asyncio.gather(
+        *(_one(file=file) for file in files),
+        *(_one(prd_text=text) for text in prd_texts)
+    )
+    return {"results": results}